@@ -57,7 +57,11 @@ def find_axis_least_penetration(a, b):
     return best_distance, best_index
 
 
-def is_overlapping(a, b):
+def is_overlapping(a, b, contacts=None):
+    """
+    Resolves the collision between a and b if they overlap. If a list is passed as
+    contacts, the arguments of apply_impulse for the collision are appended to it.
+    """
     contact_points = None
     penetration = None
 
@@ -73,11 +77,11 @@ def is_overlapping(a, b):
 
     # If true: Polygon b becomes the reference face
     if a_best_distance <= b_best_distance: # TODO: Possibly set separate condition for a_best_distance == b_best_distance
-        contact_points, penetration = get_contact_penetration(a, b, b_best_index)
+        contact_points, penetration = get_contact_penetration(a, b, b_best_index, contacts)
 
     # If true: Polygon a becomes the reference face
     elif a_best_distance > b_best_distance:  # TODO: possibly replace with else statement
-        contact_points, penetration = get_contact_penetration(b, a, a_best_index)
+        contact_points, penetration = get_contact_penetration(b, a, a_best_index, contacts)
 
     return contact_points, penetration
 
@@ -139,7 +143,7 @@ def clip(side_plane, side_norm, incident_face):
     return edges[0], edges[1]
 
 
-def get_contact_penetration(a, b, best_index):
+def get_contact_penetration(a, b, best_index, contacts=None):
     contact_points = []
     penetration = 0
 
@@ -182,6 +186,8 @@ def get_contact_penetration(a, b, best_index):
         penetration += -separation
 
     resolve_collision(a, b, contact_points, reference_normal, reference_face, penetration)
+    if contacts is not None:
+        contacts.append([a, b, contact_points, reference_normal, reference_face])
 
     return contact_points, penetration
 
@@ -1,11 +1,25 @@
 # inspiration from https://github.com/jmcelroy5/Pyglet-Game/blob/master/core.py
 from vector import Vector
 from collision import is_overlapping
+from impulse_resolution import apply_impulse
+from joint_solver import JointSolver
 
 
 class Environment:
+    """
+    Each update resolves the contacts of every pair once, including their position
+    correction, since the vertices aren't refreshed until the physics_objects are updated
+    and repeating it would push the bodies apart again. The joints are then prepared from
+    the corrected positions and solved for joint_iterations velocity iterations, followed
+    by one more velocity pass over the contacts so the last joint iterations can't push
+    bodies into what they rest on. Finally the physics_objects are updated.
+    """
     physics_objects = []  # list of all created physics_objects
     pairs = []
+    contacts = []  # contacts found in the current update
+    joints = []  # list of all created joints
+    joint_solver = JointSolver()
+    joint_iterations = 8  # velocity iterations of the joint solver per update
 
     def __init__(self, window, g=9.8):
         self.g = g  # Gravitational acceleration
@@ -15,19 +29,37 @@ class Environment:
     def generate_pairs(cls):
         """ Clears cls.pairs and generates new pairs from cls.physics_objects """
         cls.pairs.clear()
+        # Bodies connected by a joint are not tested against each other
+        jointed = set()
+        for joint in cls.joints:
+            if not joint.collide_connected:
+                jointed.add((id(joint.a), id(joint.b)))
+                jointed.add((id(joint.b), id(joint.a)))
+
         for i, a in enumerate(cls.physics_objects):
             for b in cls.physics_objects[i:]:  # the [i:] slicing skips the same pair in reversed order
                 if a == b:  # avoid pairing a with a
                     continue
+                if (id(a), id(b)) in jointed:
+                    continue
                 cls.pairs.append([a, b])
 
     @classmethod
     def update(cls, dt):
+        if cls.joint_solver.build_if_changed(cls.joints):  # joints changed, so the excluded pairs did too
+            cls.pairs.clear()
         if not cls.pairs and cls.physics_objects:  # generate pairs if there are physics_objects but no pairs
             cls.generate_pairs()
 
+        cls.contacts.clear()
         for pair in cls.pairs:
-            is_overlapping(*pair)
+            is_overlapping(*pair, contacts=cls.contacts)
+
+        if cls.joints:
+            cls.joint_solver.prepare(dt)
+            cls.joint_solver.solve(cls.joint_iterations)
+            for contact in cls.contacts:  # velocity only, positions were corrected above
+                apply_impulse(*contact)
         for po in cls.physics_objects:
             po.update(dt)
 
@@ -3,6 +3,12 @@ from vector import midpoint
 
 
 def resolve_collision(a, b, contact_points, n, reference_face, penetration):
+    correct_positions(a, b, n, penetration)
+    apply_impulse(a, b, contact_points, n, reference_face)
+
+
+def correct_positions(a, b, n, penetration):
+    """ Moves a and b apart along n by part of the penetration to avoid sinking """
     k_slop = 0.05
     percent = 0.4
     correction = max(penetration - k_slop, 0) / (a.inv_mass + b.inv_mass) * percent * n
@@ -10,6 +16,9 @@ def resolve_collision(a, b, contact_points, n, reference_face, penetration):
     a.pos += a.inv_mass * correction
     b.pos -= b.inv_mass * correction
 
+
+def apply_impulse(a, b, contact_points, n, reference_face):
+    """ Applies the collision impulse to the velocities of a and b if they're moving towards each other """
     if len(contact_points) == 2:
         mp = midpoint(Vector(*reference_face[0]), Vector(*reference_face[1]))
         r_ap = a.pos - mp
@@ -0,0 +1,76 @@
+"""
+Joints connecting two PhysicsObjects. Anchors are given in world coordinates when the
+joint is created and are stored relative to each body so they follow the body as it moves
+and rotates.
+
+Creating a joint adds it to Environment.joints, where it's solved by the batched
+JointSolver after the contacts of every update, and remove() takes it out again. Unless
+collide_connected is True, the two jointed bodies are not paired for collision tests
+against each other.
+"""
+
+from vector import Vector
+from core import Environment
+from joint_solver import DistanceBatch, RevoluteBatch, WeldBatch
+
+
+def local_point(po, point):
+    """ Returns the world point as a Vector relative to the position and angle of po """
+    return (point - po.pos).rotate(-po.theta)
+
+
+class Joint:
+    batch_class = None  # SoA batch the joint is solved in
+
+    def __init__(self, a, b, **kwargs):
+        assert a is not b, "a joint needs two different bodies"
+        self.a = a
+        self.b = b
+        self.collide_connected = kwargs.get('collide_connected', False)
+
+    def register(self):
+        """ Adds the joint to the environment, called by subclasses once every field is set """
+        Environment.joints.append(self)
+        Environment.pairs.clear()  # regenerate pairs without the jointed pair
+
+    def remove(self):
+        """ Removes the joint from the environment """
+        Environment.joints.remove(self)
+        Environment.pairs.clear()  # regenerate pairs with the previously jointed pair
+
+    def __str__(self):
+        return "<%s between %s and %s>" % (type(self).__name__, self.a, self.b)
+
+
+class DistanceJoint(Joint):
+    """ Keeps anchor_a on body a and anchor_b on body b at a fixed distance """
+    batch_class = DistanceBatch
+
+    def __init__(self, a, b, anchor_a, anchor_b, **kwargs):
+        assert isinstance(anchor_a, Vector) and isinstance(anchor_b, Vector), "anchors must be Vectors"
+        super(DistanceJoint, self).__init__(a, b, **kwargs)
+        self.local_anchor_a = local_point(a, anchor_a)
+        self.local_anchor_b = local_point(b, anchor_b)
+        self.length = kwargs.get('length', (anchor_b - anchor_a).mag())  # Rest length
+        self.register()
+
+
+class RevoluteJoint(Joint):
+    """ Pins body a and b together at anchor, letting them rotate freely around it """
+    batch_class = RevoluteBatch
+
+    def __init__(self, a, b, anchor, **kwargs):
+        assert isinstance(anchor, Vector), "anchor must be a Vector"
+        super(RevoluteJoint, self).__init__(a, b, **kwargs)
+        self.local_anchor_a = local_point(a, anchor)
+        self.local_anchor_b = local_point(b, anchor)
+        self.register()
+
+
+class WeldJoint(RevoluteJoint):
+    """ Pins body a and b together at anchor and keeps their relative angle fixed """
+    batch_class = WeldBatch
+
+    def __init__(self, a, b, anchor, **kwargs):
+        self.reference_angle = b.theta - a.theta  # set first, RevoluteJoint registers the joint
+        super(WeldJoint, self).__init__(a, b, anchor, **kwargs)
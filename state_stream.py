@@ -0,0 +1,129 @@
+"""
+Delta-compressed streaming of PhysicsObject state for other processes.
+
+StateEncoder turns a list of physics_objects into compact binary frames. Positions and
+angles are quantised to a fixed precision and only bodies whose quantised state changed
+since it was last sent are written, so the frame size scales with motion rather than with
+the number of bodies. Every keyframe_interval frames a keyframe containing every body is
+sent so a consumer that joins late or drops a frame can resynchronise.
+
+StateDecoder reads the frames back into (x, y, theta) tuples keyed by body index, the
+index being the body's position in the list given to the encoder. Every frame carries the
+current number of bodies, so bodies removed from the end of the list are dropped by the
+decoder and bodies shifted down by a removal are sent again as changed.
+
+Frame layout (little-endian):
+- header: flags (uint8), tick (uint32), number of bodies (uint32), number of records (uint32)
+- record: body index (uint32), x, y, theta (int32, in units of the precision)
+"""
+
+import math
+import struct
+
+KEYFRAME = 1
+INT32_MIN = -2**31
+INT32_MAX = 2**31 - 1
+
+HEADER = struct.Struct('<BIII')
+RECORD = struct.Struct('<Iiii')
+
+
+def quantise(value, precision):
+    """ Returns value as an integer number of precision steps, which must fit in int32 """
+    steps = value / precision
+    if not INT32_MIN <= steps <= INT32_MAX:  # also False for NaN
+        raise ValueError('%r can\'t be quantised to int32 with precision %r' % (value, precision))
+    return int(round(steps))
+
+
+def wrap_angle(theta):
+    """ Returns theta wrapped to the range [-pi, pi) """
+    return (theta + math.pi) % (2 * math.pi) - math.pi
+
+
+class StateEncoder:
+
+    def __init__(self, precision=0.01, angle_precision=0.001, keyframe_interval=60):
+        if precision <= 0 or angle_precision <= 0:
+            raise ValueError('precision and angle_precision must be positive')
+        if keyframe_interval < 1:
+            raise ValueError('keyframe_interval must be at least 1')
+        self.precision = precision  # Position quantisation step
+        self.angle_precision = angle_precision  # Angle quantisation step (radians)
+        self.keyframe_interval = keyframe_interval  # Frames between keyframes
+        self.tick = 0
+        self.last_sent = []  # quantised (x, y, theta) last sent for each body index
+        self.force_keyframe = True
+
+    def quantise_body(self, po):
+        return (quantise(po.pos.x, self.precision),
+                quantise(po.pos.y, self.precision),
+                quantise(wrap_angle(po.theta), self.angle_precision))
+
+    def encode(self, physics_objects):
+        """
+        Returns a binary frame with the bodies that changed since they were last sent. The
+        encoder's state is only updated once the whole frame has been packed, so a body that
+        can't be quantised raises ValueError and leaves the encoder as it was.
+        """
+        keyframe = self.force_keyframe or self.tick % self.keyframe_interval == 0
+
+        dirty = []  # (index, quantised state) of every body to send
+        records = []
+        for i, po in enumerate(physics_objects):
+            state = self.quantise_body(po)
+            if keyframe or i >= len(self.last_sent) or state != self.last_sent[i]:  # body is dirty
+                dirty.append((i, state))
+                records.append(RECORD.pack(i, *state))
+
+        flags = KEYFRAME if keyframe else 0
+        frame = HEADER.pack(flags, self.tick, len(physics_objects), len(records)) + b''.join(records)
+
+        # Frame is complete, commit the sent states
+        del self.last_sent[len(physics_objects):]  # forget bodies that were removed
+        self.last_sent.extend([None] * (len(physics_objects) - len(self.last_sent)))  # new bodies
+        for i, state in dirty:
+            self.last_sent[i] = state
+        self.force_keyframe = False
+        self.tick = (self.tick + 1) & 0xFFFFFFFF
+        return frame
+
+
+class StateDecoder:
+
+    def __init__(self, precision=0.01, angle_precision=0.001):
+        # Must match the precision of the StateEncoder producing the frames
+        self.precision = precision
+        self.angle_precision = angle_precision
+        self.states = {}  # body index -> (x, y, theta)
+        self.expected_tick = None  # None until the first keyframe has been received
+
+    def decode(self, frame):
+        """
+        Applies a frame to the stored state and returns the full state as a dict of
+        body index -> (x, y, theta). The returned dict is a copy and isn't changed by later
+        calls. Returns None while out of sync, i.e. before the first keyframe or after a
+        dropped frame until the next keyframe arrives.
+        """
+        flags, tick, body_count, count = HEADER.unpack_from(frame)
+        keyframe = flags & KEYFRAME
+
+        if not keyframe and tick != self.expected_tick:
+            self.expected_tick = None  # missed a delta, wait for the next keyframe
+            return None
+
+        if len(frame) != HEADER.size + count * RECORD.size:
+            raise ValueError('frame length does not match its record count')
+
+        if keyframe:
+            self.states.clear()
+        else:
+            for i in [i for i in self.states if i >= body_count]:  # bodies that were removed
+                del self.states[i]
+
+        for k in range(count):
+            i, qx, qy, qtheta = RECORD.unpack_from(frame, HEADER.size + k * RECORD.size)
+            self.states[i] = (qx * self.precision, qy * self.precision, qtheta * self.angle_precision)
+
+        self.expected_tick = (tick + 1) & 0xFFFFFFFF
+        return dict(self.states)